@@ -0,0 +1,334 @@
+from array import array  # Кольцевые буферы в заранее выделенных массивах
+from datetime import datetime, timedelta
+from math import sqrt
+
+from .MOEXPy import MOEXPy, Event  # Московское время и событие с подпиской / отменой подписки
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированной длины в заранее выделенном массиве"""
+    def __init__(self, size: int):
+        self.size = size  # Длина буфера
+        self.values = array('d', bytes(8 * size))  # Заранее выделенный массив значений
+        self.index = 0  # Позиция для записи следующего значения
+        self.count = 0  # Кол-во записанных значений (не больше длины буфера)
+
+    def push(self, value: float) -> float | None:
+        """Добавить значение
+
+        :param float value: Значение
+        :return: Вытесненное значение или None, если буфер еще не заполнен
+        """
+        old = self.values[self.index] if self.count == self.size else None  # Если буфер заполнен, то вытесняем самое старое значение
+        self.values[self.index] = value  # Записываем новое значение на его место
+        self.index = (self.index + 1) % self.size  # Переходим к следующей позиции
+        if self.count < self.size:  # Если буфер еще не заполнен
+            self.count += 1  # то увеличиваем кол-во значений
+        return old
+
+    @property
+    def full(self) -> bool:
+        """Буфер заполнен"""
+        return self.count == self.size
+
+
+class SMA:
+    """Простая скользящая средняя цены закрытия"""
+    def __init__(self, period: int):
+        self.period = period  # Период
+        self.buffer = RingBuffer(period)  # Последние цены закрытия
+        self.total = 0.0  # Сумма цен закрытия в буфере
+        self.value = None  # Значения пока нет
+
+    def update(self, bar) -> float | None:
+        """Обновление по новому бару за O(1)
+
+        :param Bar bar: Бар
+        :return: Значение индикатора или None, если недостаточно баров
+        """
+        old = self.buffer.push(bar.close)  # Добавляем цену закрытия, получаем вытесненную
+        self.total += bar.close - (0.0 if old is None else old)  # Обновляем сумму без пересчета всего буфера
+        self.value = self.total / self.period if self.buffer.full else None
+        return self.value
+
+
+class EMA:
+    """Экспоненциальная скользящая средняя цены закрытия"""
+    def __init__(self, period: int):
+        self.period = period  # Период
+        self.alpha = 2 / (period + 1)  # Коэффициент сглаживания
+        self.count = 0  # Кол-во полученных баров
+        self.total = 0.0  # Сумма цен закрытия до первого значения
+        self.value = None  # Значения пока нет
+
+    def update(self, bar) -> float | None:
+        """Обновление по новому бару за O(1)
+
+        :param Bar bar: Бар
+        :return: Значение индикатора или None, если недостаточно баров
+        """
+        self.count += 1  # Получили еще один бар
+        if self.value is not None:  # Если значение уже есть
+            self.value += self.alpha * (bar.close - self.value)  # то сглаживаем
+        else:  # Если значения еще нет
+            self.total += bar.close  # то накапливаем цены закрытия
+            if self.count == self.period:  # Первое значение
+                self.value = self.total / self.period  # равно простой средней
+        return self.value
+
+
+class VWAP:
+    """Скользящая средневзвешенная по объему цена. Цена бара - типичная (high + low + close) / 3"""
+    def __init__(self, period: int):
+        self.period = period  # Период
+        self.pv_buffer = RingBuffer(period)  # Последние цены, умноженные на объем
+        self.v_buffer = RingBuffer(period)  # Последние объемы
+        self.pv_total = 0.0  # Сумма цен, умноженных на объем
+        self.v_total = 0.0  # Сумма объемов
+        self.value = None  # Значения пока нет
+
+    def update(self, bar) -> float | None:
+        """Обновление по новому бару за O(1)
+
+        :param Bar bar: Бар
+        :return: Значение индикатора или None, если недостаточно баров или нулевой объем
+        """
+        pv = (bar.high + bar.low + bar.close) / 3 * bar.volume  # Типичная цена, умноженная на объем
+        old_pv = self.pv_buffer.push(pv)
+        old_v = self.v_buffer.push(bar.volume)
+        self.pv_total += pv - (0.0 if old_pv is None else old_pv)  # Обновляем суммы без пересчета всего буфера
+        self.v_total += bar.volume - (0.0 if old_v is None else old_v)
+        self.value = self.pv_total / self.v_total if self.v_buffer.full and self.v_total > 0 else None
+        return self.value
+
+
+class ATR:
+    """Средний истинный диапазон со сглаживанием Уайлдера"""
+    def __init__(self, period: int):
+        self.period = period  # Период
+        self.count = 0  # Кол-во полученных баров
+        self.total = 0.0  # Сумма истинных диапазонов до первого значения
+        self.prev_close = None  # Цены закрытия предыдущего бара пока нет
+        self.value = None  # Значения пока нет
+
+    def update(self, bar) -> float | None:
+        """Обновление по новому бару за O(1)
+
+        :param Bar bar: Бар
+        :return: Значение индикатора или None, если недостаточно баров
+        """
+        if self.prev_close is None:  # Для первого бара
+            tr = bar.high - bar.low  # истинный диапазон равен диапазону бара
+        else:  # Для следующих баров учитываем гэп от цены закрытия предыдущего бара
+            tr = max(bar.high, self.prev_close) - min(bar.low, self.prev_close)
+        self.prev_close = bar.close  # Запоминаем цену закрытия
+        self.count += 1  # Получили еще один бар
+        if self.value is not None:  # Если значение уже есть
+            self.value += (tr - self.value) / self.period  # то сглаживаем по Уайлдеру
+        else:  # Если значения еще нет
+            self.total += tr  # то накапливаем истинные диапазоны
+            if self.count == self.period:  # Первое значение
+                self.value = self.total / self.period  # равно простой средней
+        return self.value
+
+
+class ZScore:
+    """Скользящий z-score цены закрытия: отклонение от средней в стандартных отклонениях"""
+    def __init__(self, period: int):
+        self.period = period  # Период
+        self.buffer = RingBuffer(period)  # Последние цены закрытия
+        self.total = 0.0  # Сумма цен закрытия в буфере
+        self.total_sq = 0.0  # Сумма квадратов цен закрытия в буфере
+        self.value = None  # Значения пока нет
+
+    def update(self, bar) -> float | None:
+        """Обновление по новому бару за O(1)
+
+        :param Bar bar: Бар
+        :return: Значение индикатора или None, если недостаточно баров или цены не менялись
+        """
+        old = self.buffer.push(bar.close)  # Добавляем цену закрытия, получаем вытесненную
+        if old is not None:  # Если цена вытеснена
+            self.total -= old  # то убираем ее из сумм
+            self.total_sq -= old * old
+        self.total += bar.close
+        self.total_sq += bar.close * bar.close
+        if not self.buffer.full:  # Если баров недостаточно
+            self.value = None  # то значения нет
+            return self.value
+        mean = self.total / self.period  # Средняя
+        variance = self.total_sq / self.period - mean * mean  # Дисперсия
+        self.value = (bar.close - mean) / sqrt(variance) if variance > 1e-12 * mean * mean else None  # Погрешность округления не считаем разбросом цен
+        return self.value
+
+
+class Bar:
+    """Бар"""
+    __slots__ = ('datetime', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, dt: datetime, open_: float, high: float, low: float, close: float, volume: float):
+        self.datetime = dt  # Дата и время начала бара
+        self.open = open_  # Цена открытия
+        self.high = high  # Максимальная цена
+        self.low = low  # Минимальная цена
+        self.close = close  # Цена закрытия
+        self.volume = volume  # Объем
+
+    def __repr__(self):
+        return f'Bar({self.datetime:%d.%m.%Y %H:%M:%S} O:{self.open} H:{self.high} L:{self.low} C:{self.close} V:{self.volume})'
+
+
+class Indicators:
+    """Потоковые индикаторы по барам тикера. Каждый новый бар обновляет все индикаторы за O(1)
+
+    Пример: indicators = Indicators(sma20=SMA(20), ema50=EMA(50), vwap=VWAP(20), atr=ATR(14), z=ZScore(20))
+    """
+    candles_columns = ('begin', 'open', 'high', 'low', 'close', 'volume')  # Колонки свечей get_candles
+    tradestats_columns = ('tradetime', 'pr_open', 'pr_high', 'pr_low', 'pr_close', 'vol')  # Колонки Super Candles get_stats('trade', ...)
+
+    def __init__(self, **indicators):
+        """Инициализация
+
+        :param indicators: Индикаторы по названиям
+        """
+        self.indicators = dict(indicators)  # Индикаторы по названиям
+        self.bar = None  # Последний закрытый бар
+        self.live_bar = None  # Последний незакрытый бар
+        self.on_bar = Event()  # Обновление индикаторов по закрытому бару. При прогреве по истории не вызывается
+        self.mp_provider = None  # Подписки пока нет
+        self.subscription = None
+
+    def add(self, name: str, indicator) -> None:
+        """Добавить индикатор. Его нужно добавить до прогрева
+
+        :param str name: Название индикатора
+        :param indicator: Индикатор
+        """
+        self.indicators[name] = indicator
+
+    @property
+    def values(self) -> dict[str, float | None]:
+        """Текущие значения индикаторов по названиям"""
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def update(self, bar: Bar, trigger=True) -> dict[str, float | None] | None:
+        """Обновить индикаторы по закрытому бару
+
+        :param Bar bar: Бар
+        :param bool trigger: Вызвать событие on_bar
+        :return: Значения индикаторов по названиям или None, если бар уже был
+        """
+        if self.bar is not None and bar.datetime <= self.bar.datetime:  # Если бар уже был (например, при прогреве)
+            return None  # то пропускаем его
+        for indicator in self.indicators.values():  # Пробегаемся по всем индикаторам
+            indicator.update(bar)  # Обновляем индикатор
+        self.bar = bar  # Запоминаем бар
+        values = self.values  # Значения индикаторов
+        if trigger:  # Если нужно вызвать событие
+            self.on_bar.trigger(bar, values)
+        return values
+
+    def flush(self) -> dict[str, float | None] | None:
+        """Закрыть последний незакрытый бар. Например, по окончании торговой сессии
+
+        :return: Значения индикаторов по названиям или None, если незакрытого бара нет
+        """
+        if self.live_bar is None:  # Если незакрытого бара нет
+            return None  # то выходим, дальше не продолжаем
+        bar, self.live_bar = self.live_bar, None  # Бар больше не считаем незакрытым
+        return self.update(bar)
+
+    def warmup(self, content) -> dict[str, float | None] | None:
+        """Прогрев индикаторов по истории за один проход. Последний бар, если он еще не закрыт, становится незакрытым баром
+
+        :param dict content: Ответ get_candles или get_stats('trade', ...)
+        :return: Значения индикаторов по названиям после прогрева
+        """
+        if content is None:  # Если история не получена
+            return None  # то выходим, дальше не продолжаем
+        block = content['candles']  # Свечи и Super Candles приходят в блоке candles
+        col = {name: idx for idx, name in enumerate(block['columns'])}  # Колонки с их порядковыми номерами
+        if 'begin' in col:  # Свечи
+            dt_idx, *ohlcv_idx = (col[name] for name in self.candles_columns)
+            to_datetime = lambda row: datetime.strptime(row[dt_idx], '%Y-%m-%d %H:%M:%S')
+            end_idx = col['end']
+            to_end = lambda row: datetime.strptime(row[end_idx], '%Y-%m-%d %H:%M:%S')
+        else:  # Super Candles
+            dt_idx, *ohlcv_idx = (col[name] for name in self.tradestats_columns)
+            date_idx = col['tradedate']
+            to_datetime = lambda row: datetime.strptime(f'{row[date_idx]} {row[dt_idx]}', '%Y-%m-%d %H:%M:%S')
+            to_end = lambda row: to_datetime(row) + timedelta(minutes=5)  # Super Candles пятиминутные
+        o, h, l, c, v = ohlcv_idx
+        data = block['data']  # Бары истории
+        if not data:  # Если баров нет
+            return self.values  # то выходим, дальше не продолжаем
+        for row in data[:-1]:  # Пробегаемся по всем барам, кроме последнего
+            self.update(Bar(to_datetime(row), float(row[o]), float(row[h]), float(row[l]), float(row[c]), float(row[v])), False)
+        row = data[-1]  # Последний бар
+        bar = Bar(to_datetime(row), float(row[o]), float(row[h]), float(row[l]), float(row[c]), float(row[v]))
+        if to_end(row) < datetime.now(MOEXPy.tz_msk).replace(tzinfo=None):  # Если последний бар уже закрыт
+            self.update(bar, False)  # то обновляем по нему индикаторы
+        elif self.bar is None or self.bar.datetime < bar.datetime:  # Если бар еще формируется
+            self.live_bar = bar  # то запоминаем его незакрытым. Подписка обновит его и закроет
+        return self.values
+
+    # Подписка WebSocket
+
+    def subscribe(self, mp_provider, dataname: str, tf: str) -> None:
+        """Подписка на бары тикера. Индикаторы обновляются по закрытию каждого бара
+
+        :param MOEXPy mp_provider: Подключение к Algopack API Московской Биржи
+        :param str dataname: Название тикера
+        :param str tf: Временной интервал https://ru.wikipedia.org/wiki/Таймфрейм
+        """
+        self.unsubscribe()  # Отменяем предыдущую подписку, если она была. Незакрытый бар остается, его обновит новая подписка
+        board, _ = mp_provider.dataname_to_board_symbol(dataname)  # Код режима торгов из названия тикера
+        _, marketplace, _ = mp_provider.get_market_engine(board)  # Торговая площадка
+        self.mp_provider = mp_provider
+        self.subscription = {
+            'destination': f'{marketplace}.candles',  # на бары
+            'selector': dict(ticker=f'{marketplace}.{dataname}', interval=mp_provider.timeframe_to_moex_ws_timeframe(tf)),  # тикера по временнОму интервалу МосБиржи
+        }
+        mp_provider.on_message.subscribe(self.on_message)  # Обработчик события прихода бара
+        mp_provider.send_websocket(cmd='SUBSCRIBE', params=self.subscription)  # В параметры будет добавлен уникальный номер подписки
+        if 'id' not in self.subscription:  # Если подписаться не удалось (нет подключения к серверу WebSocket)
+            mp_provider.logger.error(f'Не удалось подписаться на бары тикера {dataname}')
+            mp_provider.on_message.unsubscribe(self.on_message)  # то возвращаем состояние без подписки
+            self.mp_provider = None
+            self.subscription = None
+
+    def unsubscribe(self) -> None:
+        """Отмена подписки на бары тикера. Незакрытый бар не закрывается. По окончании торговой сессии вызовите flush()"""
+        if self.mp_provider is None:  # Если подписки нет
+            return  # то выходим, дальше не продолжаем
+        self.mp_provider.on_message.unsubscribe(self.on_message)
+        subscription_id = self.subscription.get('id')  # Уникальный номер подписки
+        if subscription_id is not None:  # Если подписка есть на сервере
+            self.mp_provider.send_websocket(cmd='UNSUBSCRIBE', params={'id': subscription_id})  # то отменяем ее
+        self.mp_provider = None
+        self.subscription = None
+
+    def on_message(self, headers, body) -> None:
+        """Обработчик события прихода бара подписки
+
+        :param dict headers: Заголовки сообщения с данными подписки
+        :param dict body: Сообщение
+        """
+        if self.subscription is None or headers.get('subscription') != self.subscription.get('id'):  # Если пришла другая подписка
+            return  # то выходим, дальше не продолжаем
+        for row in body['data']:  # Пробегаемся по всем строкам
+            row_dict = dict(zip(body['columns'], row))  # Переводим строку бара в словарь
+            bar = Bar(datetime.fromisoformat(row_dict['FROM']), self.ws_price(row_dict['OPEN']), self.ws_price(row_dict['HIGH']),
+                      self.ws_price(row_dict['LOW']), self.ws_price(row_dict['CLOSE']), float(row_dict['VOLUME']))
+            if self.live_bar is not None and self.live_bar.datetime < bar.datetime:  # Если время бара стало больше (предыдущий бар закрыт, новый бар открыт)
+                self.update(self.live_bar)  # то обновляем индикаторы по закрытому бару
+            self.live_bar = bar  # Запоминаем незакрытый бар
+
+    @staticmethod
+    def ws_price(value) -> float:
+        """Цена из сообщения подписки
+
+        :param value: Цена в виде [цена, кол-во десятичных знаков] или числа
+        :return: Цена
+        """
+        return float(value[0]) if isinstance(value, list) else float(value)
@@ -0,0 +1,171 @@
+import json
+from bisect import bisect_left  # Поиск в отсортированных датах экспирации
+from concurrent.futures import ThreadPoolExecutor  # Параллельная загрузка режимов торгов
+from datetime import datetime, timedelta
+
+from requests import RequestException  # Ошибки запросов через HTTP API
+
+
+class Instruments:
+    """Справочник инструментов всех режимов торгов с быстрым поиском без запросов к бирже
+
+    Строится из блоков securities get_all_tickers, хранится локально. Каждый режим торгов обновляется раз в день
+    """
+    file_name = 'instruments.json'  # Файл справочника в локальном хранилище
+
+    def __init__(self, mp_provider, boards=None, refresh=True):
+        """Инициализация
+
+        :param MOEXPy mp_provider: Подключение к Algopack API Московской Биржи
+        :param list[str] boards: Режимы торгов. По умолчанию, все торгуемые режимы торгов
+        :param bool refresh: Обновить режимы торгов, полученные не сегодня
+        """
+        self.mp_provider = mp_provider
+        self.boards = boards if boards is not None else [board for board, row in mp_provider.boards_dict.items() if row.get('is_traded') == 1]  # Режимы торгов
+        self.file = mp_provider.cache_path / self.file_name  # Файл справочника
+        self.dates = {}  # Даты получения по режимам торгов
+        self.securities = {}  # Блоки securities по режимам торгов
+        self.load()  # Загружаем справочник из локального хранилища
+        if refresh:  # Если нужно обновить справочник
+            self.refresh()  # то обновляем его
+
+    def load(self) -> None:
+        """Загрузка справочника из локального хранилища"""
+        if not self.file.exists():  # Если справочника нет
+            self.build_index()  # то строим пустые индексы
+            return  # Выходим, дальше не продолжаем
+        with open(self.file, encoding='utf-8') as f:
+            content = json.load(f)
+        self.dates = content['dates']  # Даты получения по режимам торгов
+        self.securities = content['securities']  # Блоки securities по режимам торгов
+        self.build_index()  # Строим индексы
+
+    def save(self) -> None:
+        """Сохранение справочника в локальное хранилище"""
+        self.mp_provider.save_json(self.file, dict(dates=self.dates, securities=self.securities))
+
+    def refresh(self, force=False) -> int:
+        """Обновление режимов торгов, полученных не сегодня или не полученных вовсе. Режимы торгов, которые не удалось получить, остаются из предыдущего справочника и будут запрошены при следующем обновлении
+
+        :param bool force: Обновить все режимы торгов, даже полученные сегодня
+        :return: Кол-во режимов торгов, которые не удалось получить
+        """
+        today = datetime.now(self.mp_provider.tz_msk).date().isoformat()  # Сегодняшняя дата по МСК
+        boards = [board for board in self.boards if force or self.dates.get(board) != today]  # Режимы торгов для обновления
+        if not boards:  # Если все режимы торгов уже получены сегодня
+            return 0  # то обновлять не нужно
+        with ThreadPoolExecutor(max_workers=self.mp_provider.max_workers) as executor:  # Загружаем режимы торгов параллельно
+            contents = list(executor.map(self.get_board_securities, boards))
+        failed = 0  # Кол-во не полученных режимов торгов
+        for board, securities in zip(boards, contents):  # Пробегаемся по обновляемым режимам торгов
+            if securities is None:  # Если режим торгов не получен
+                self.mp_provider.logger.warning(f'Справочник инструментов: режим торгов {board} не получен, используются прежние данные')
+                failed += 1
+                continue  # то оставляем прежние данные и дату их получения
+            self.securities[board] = securities  # Заменяем данные режима торгов
+            self.dates[board] = today  # Режим торгов обновлен сегодня
+        self.mp_provider.logger.debug(f'Справочник инструментов: получено режимов торгов {len(boards) - failed} из {len(boards)}')
+        if failed < len(boards):  # Если хоть что-то получили
+            self.save()  # то сохраняем справочник
+            self.build_index()  # Перестраиваем индексы
+        return failed
+
+    def get_board_securities(self, board):
+        """Блок securities режима торгов
+
+        :param str board: Режим торгов
+        :return: Колонки и данные инструментов или None в случае ошибки
+        """
+        try:
+            with self.mp_provider.requests_semaphore:  # Общий лимит одновременных запросов
+                content = self.mp_provider.get_all_tickers(board)
+        except RequestException as e:  # Если запрос не выполнился. Например, нет соединения
+            self.mp_provider.logger.warning(f'Справочник инструментов: ошибка запроса режима торгов {board}: {e}')
+            return None
+        if content is None:  # Если ответ не пришел
+            return None  # то выходим, дальше не продолжаем
+        return dict(columns=content['securities']['columns'], data=content['securities']['data'])
+
+    def build_index(self) -> None:
+        """Построение индексов по SECID, ISIN, режиму торгов и датам экспирации фьючерсов. Индексируются только режимы торгов справочника"""
+        self.by_secid = {}  # Инструменты по тикеру. Один тикер может торговаться в нескольких режимах торгов
+        self.by_isin = {}  # Инструменты по ISIN
+        self.by_board = {}  # Инструменты режима торгов по тикеру
+        chains = {}  # Фьючерсы по базовому активу
+        for board in self.boards:  # Пробегаемся по всем режимам торгов справочника. В общем файле могут быть и другие
+            securities = self.securities.get(board)  # Блок securities режима торгов
+            if securities is None:  # Если режим торгов еще не получен
+                continue  # то переходим к следующему
+            columns = securities['columns']  # Колонки инструментов
+            board_dict = self.by_board[board] = {}
+            is_futures = self.mp_provider.get_market_engine(board)[0] == 'forts'  # Фьючерсный рынок
+            for row in securities['data']:  # Пробегаемся по всем инструментам
+                security = dict(zip(columns, row))  # Инструмент в виде словаря
+                secid = security['SECID']  # Тикер
+                board_dict[secid] = security
+                self.by_secid.setdefault(secid, []).append(security)
+                isin = security.get('ISIN')
+                if isin:  # Если ISIN есть
+                    self.by_isin.setdefault(isin, []).append(security)
+                if is_futures and security.get('ASSETCODE') and security.get('LASTTRADEDATE'):  # Если фьючерс с базовым активом и датой экспирации
+                    chains.setdefault(security['ASSETCODE'], []).append(security)
+        self.futures_chains = {}  # Фьючерсы по базовому активу: (отсортированные даты экспирации, фьючерсы в том же порядке)
+        for asset, futures in chains.items():  # Пробегаемся по всем базовым активам
+            futures.sort(key=lambda security: security['LASTTRADEDATE'])  # Даты в формате ГГГГ-ММ-ДД сортируются как строки
+            self.futures_chains[asset] = ([security['LASTTRADEDATE'] for security in futures], futures)
+
+    # Поиск
+
+    def get_by_secid(self, secid) -> list[dict]:
+        """Инструменты по тикеру во всех режимах торгов
+
+        :param str secid: Тикер
+        """
+        return self.by_secid.get(secid, [])
+
+    def get_by_isin(self, isin) -> list[dict]:
+        """Инструменты по ISIN во всех режимах торгов
+
+        :param str isin: ISIN
+        """
+        return self.by_isin.get(isin, [])
+
+    def get_ticker(self, board, secid) -> dict | None:
+        """Инструмент режима торгов
+
+        :param str board: Режим торгов
+        :param str secid: Тикер
+        """
+        return self.by_board.get(board, {}).get(secid)
+
+    def get_board_tickers(self, board) -> list[dict]:
+        """Все инструменты режима торгов
+
+        :param str board: Режим торгов
+        """
+        return list(self.by_board.get(board, {}).values())
+
+    def get_futures_chain(self, asset, dt=None) -> list[dict]:
+        """Фьючерсы базового актива, не истекшие на дату, от ближнего к дальнему
+
+        :param str asset: Базовый актив. Например, Si
+        :param date dt: Дата. По умолчанию, сегодня
+        """
+        if asset not in self.futures_chains:  # Если фьючерсов на базовый актив нет
+            return []  # то выходим, дальше не продолжаем
+        if dt is None:  # Если дата не указана
+            dt = datetime.now(self.mp_provider.tz_msk).date()  # то берем сегодняшнюю по МСК
+        dates, futures = self.futures_chains[asset]
+        return futures[bisect_left(dates, dt.isoformat()[:10]):]  # Фьючерсы с датой экспирации не раньше даты
+
+    def get_future_on_date(self, asset, dt=None, days_before_expiry=0) -> dict | None:
+        """Ближний фьючерс базового актива на дату
+
+        :param str asset: Базовый актив. Например, Si
+        :param date dt: Дата. По умолчанию, сегодня
+        :param int days_before_expiry: За сколько дней до экспирации переходить на следующий фьючерс
+        """
+        if dt is None:  # Если дата не указана
+            dt = datetime.now(self.mp_provider.tz_msk).date()  # то берем сегодняшнюю по МСК
+        chain = self.get_futures_chain(asset, dt + timedelta(days=days_before_expiry))
+        return chain[0] if chain else None
@@ -1,14 +1,18 @@
 import json
 import logging  # Будем вести лог
+import os
+import tempfile  # Временные файлы локального хранилища
+from concurrent.futures import ThreadPoolExecutor  # Параллельная загрузка по датам
 from datetime import datetime, timedelta
-from threading import Thread
+from pathlib import Path  # Локальное хранилище
+from threading import Thread, BoundedSemaphore
 from typing import Literal, Any
 from uuid import uuid4  # Уникальный идентификатор подписки
 from zoneinfo import ZoneInfo  # ВременнАя зона
 from json import loads  # Получаем ответы в формае JSON
 
 import keyring  # Безопасное хранение торгового токена
-from requests import get  # Запросы через HTTP API
+from requests import get, RequestException  # Запросы через HTTP API
 from websockets import Subprotocol  # Протокол STOMP
 from websockets.sync.client import connect  # Подключение к серверу WebSockets в синхронном режиме
 from stomp.utils import Frame, convert_frame, parse_frame  # Работа с сервером WebSockets по протоколу STOMP
@@ -21,6 +25,9 @@ class MOEXPy:
     api_server = 'https://apim.moex.com/iss'  # Алгопак (ISS)
     engine_map = dict(stocks='eq', futures='fo', currency='fx')  # Площадки Алгопака: Акции/фьючерсы/вылюта
     tz_msk = ZoneInfo('Europe/Moscow')  # Московская Биржа работает по московскому времени
+    cache_path = Path.home() / '.MOEXPy'  # Локальное хранилище данных за прошедшие дни
+    max_workers = 4  # Кол-во одновременных запросов при загрузке по диапазону дат
+    publication_days = 1  # Через сколько дней пустые данные за дату считаем неторговым днем, а не еще не опубликованными
     logger = logging.getLogger('MOEXPy')  # Будем вести лог
 
     def __init__(self, token=None, login=None, passcode=None):
@@ -67,6 +74,7 @@ class MOEXPy:
         self.boards_dict = {row[boards_columns.index('boardid')]: {col: row[i] for i, col in enumerate(boards_columns) if col != 'boardid'} for row in boards_data}  # Справочник по ключу boardid
 
         self.subscriptions = {}  # Справочник подписок
+        self.requests_semaphore = BoundedSemaphore(self.max_workers)  # Общий лимит одновременных запросов для всех загрузок по диапазону дат
 
     # Real-time market data - Акции - https://moexalgo.github.io/docs/api/real-time-market-data-акции
     # Real-time market data - Фьючерсы - https://moexalgo.github.io/docs/api/real-time-market-data-фьючерсы
@@ -91,6 +99,8 @@ class MOEXPy:
                 return None  # то выходим, дальше не продолжаем
             data = content['securities']['data']  # Пришедшие данные
             if len(data) == 0:  # Если данных нет (достигнут конец выборки)
+                if all_data is None:  # Если в режиме торгов нет инструментов
+                    all_data = content  # то возвращаем пустые данные, чтобы отличить от ошибки
                 break  # то выходим
             if all_data is None:  # Если это первые пришедшие данные
                 all_data = content  # то сохраняем их полностью
@@ -292,6 +302,27 @@ class MOEXPy:
         params = dict(date=date)
         return self.check_result(get(url, params=params, headers=self.headers))
 
+    def get_all_hi2_range(self, engine: Literal['stock', 'futures', 'currency'], dt_from, dt_till, skip_weekends=False):
+        """Индекс рыночной концентрации (Херфиндаля-Хиршмана) по всем инструментам за диапазон дат
+
+        :param Literal['stock', 'futures', 'currency'] engine: Торговая площадка акций/фьючерсов/валют
+        :param date dt_from: Дата начала запроса
+        :param date dt_till: Дата окончания запроса
+        :param bool skip_weekends: Пропускать субботы и воскресенья. На бирже бывают и торги в выходные дни
+        """
+        return self.get_date_range(f'{engine}/hi2', lambda dt: self.get_all_hi2(engine, dt), dt_from, dt_till, skip_weekends)
+
+    def get_hi2_range(self, engine: Literal['stock', 'futures', 'currency'], ticker, dt_from, dt_till, skip_weekends=False):
+        """Индекс рыночной концентрации (Херфиндаля-Хиршмана) по инструменту за диапазон дат
+
+        :param Literal['stock', 'futures', 'currency'] engine: Торговая площадка акций/фьючерсов/валют
+        :param str ticker: Тикер
+        :param date dt_from: Дата начала запроса
+        :param date dt_till: Дата окончания запроса
+        :param bool skip_weekends: Пропускать субботы и воскресенья. На бирже бывают и торги в выходные дни
+        """
+        return self.get_date_range(f'{engine}/hi2/{ticker}', lambda dt: self.get_hi2(engine, ticker, dt), dt_from, dt_till, skip_weekends)
+
     # Mega Alerts - https://moexalgo.github.io/docs/api/mega-alerts
 
     def get_all_alerts(self, engine: Literal['stock', 'futures'], date):
@@ -315,6 +346,125 @@ class MOEXPy:
         params = dict(date=date)
         return self.check_result(get(url, params=params, headers=self.headers))
 
+    def get_all_alerts_range(self, engine: Literal['stock', 'futures'], dt_from, dt_till, skip_weekends=False):
+        """Торговые аномалии по всем инструментам за диапазон дат
+
+        :param Literal['stock', 'futures'] engine: Торговая площадка акций/фьючерсов
+        :param date dt_from: Дата начала запроса
+        :param date dt_till: Дата окончания запроса
+        :param bool skip_weekends: Пропускать субботы и воскресенья. На бирже бывают и торги в выходные дни
+        """
+        return self.get_date_range(f'{engine}/alerts', lambda dt: self.get_all_alerts(engine, dt), dt_from, dt_till, skip_weekends)
+
+    def get_alerts_range(self, engine: Literal['stock', 'futures'], ticker, dt_from, dt_till, skip_weekends=False):
+        """Торговые аномалии по инструменту за диапазон дат
+
+        :param Literal['stock', 'futures'] engine: Торговая площадка акций/фьючерсов
+        :param str ticker: Тикер
+        :param date dt_from: Дата начала запроса
+        :param date dt_till: Дата окончания запроса
+        :param bool skip_weekends: Пропускать субботы и воскресенья. На бирже бывают и торги в выходные дни
+        """
+        return self.get_date_range(f'{engine}/alerts/{ticker}', lambda dt: self.get_alerts(engine, ticker, dt), dt_from, dt_till, skip_weekends)
+
+    # Загрузка по диапазону дат
+
+    def get_date_range(self, name, get_date, dt_from, dt_till, skip_weekends=False):
+        """Параллельная загрузка данных по датам диапазона. Прошедшие дни берутся из локального хранилища
+
+        :param str name: Путь к данным в локальном хранилище
+        :param get_date: Функция получения данных за дату
+        :param date dt_from: Дата начала запроса
+        :param date dt_till: Дата окончания запроса
+        :param bool skip_weekends: Пропускать субботы и воскресенья, не запрашивая их. На бирже бывают и торги в выходные дни.
+            Неторговые дни без этого параметра запрашиваются один раз и сохраняются в локальное хранилище
+        :return: Данные всех дат, объединенные в ответ как за одну дату. None, если ни одна дата не получена. Не полученные даты пишутся в лог
+        """
+        dt_from = dt_from.date() if isinstance(dt_from, datetime) else dt_from  # Работаем только с датами
+        dt_till = dt_till.date() if isinstance(dt_till, datetime) else dt_till
+        dates = [dt_from + timedelta(days=i) for i in range((dt_till - dt_from).days + 1)]  # Все даты диапазона
+        if skip_weekends:  # Если выходные дни не нужны
+            dates = [dt for dt in dates if dt.weekday() < 5]  # то оставляем только будние дни
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:  # Загружаем даты параллельно
+            contents = list(executor.map(lambda dt: self.get_cached_date(name, get_date, dt), dates))  # Ответы в порядке дат
+        all_data = None  # Накопленные данные
+        failed_dates = []  # Не полученные даты
+        for dt, content in zip(dates, contents):  # Пробегаемся по ответам всех дат
+            if not self.is_data_content(content):  # Если ответ не пришел или пришла ошибка
+                self.logger.warning(f'Данные {name} за {dt:%d.%m.%Y} не получены')
+                failed_dates.append(dt)
+                continue  # то переходим к следующей дате
+            if all_data is None:  # Если это первые пришедшие данные
+                all_data = content  # то сохраняем их полностью
+                continue
+            for block, block_data in content.items():  # Пробегаемся по всем блокам ответа
+                if not block.endswith('.cursor') and isinstance(block_data, dict) and 'data' in block_data and block in all_data:  # Курсор пагинации не объединяем
+                    all_data[block]['data'].extend(block_data['data'])  # Добавляем данные блока к уже имеющимся
+        if failed_dates:  # Если есть не полученные даты
+            self.logger.warning(f'Данные {name}: не получено дат {len(failed_dates)} из {len(dates)}: {", ".join(f"{dt:%d.%m.%Y}" for dt in failed_dates)}')
+        return all_data
+
+    def get_cached_date(self, name, get_date, dt):
+        """Данные за дату из локального хранилища. Если их там нет, то загружаем. Прошедшие дни сохраняем в хранилище.
+        Пустые данные (неторговый день) сохраняем, когда биржа уже точно их опубликовала
+
+        :param str name: Путь к данным в локальном хранилище
+        :param get_date: Функция получения данных за дату
+        :param date dt: Дата
+        :return: Данные за дату или None в случае ошибки
+        """
+        file = self.cache_path / name / f'{dt:%Y-%m-%d}.json'  # Файл данных за дату
+        if file.exists():  # Если данные есть в хранилище
+            with open(file, encoding='utf-8') as f:
+                return json.load(f)  # то берем их оттуда
+        try:
+            with self.requests_semaphore:  # Ждем, пока не освободится место в общем лимите одновременных запросов
+                content = get_date(dt)  # Отправляем запрос, получаем ответ
+        except RequestException as e:  # Если запрос не выполнился. Например, нет соединения
+            self.logger.warning(f'Ошибка запроса данных {name} за {dt:%d.%m.%Y}: {e}')
+            return None
+        today = datetime.now(self.tz_msk).date()  # Сегодняшняя дата по МСК
+        if dt >= today:  # Если торги по дате еще могут идти
+            return content  # то в хранилище не сохраняем
+        if not self.is_data_content(content):  # Если пришла ошибка
+            return content  # то в хранилище не сохраняем, загрузим в следующий раз
+        if not self.is_data_content(content, True) and dt >= today - timedelta(days=self.publication_days):  # Если данных нет, но биржа могла их еще не опубликовать
+            return content  # то в хранилище не сохраняем, загрузим в следующий раз
+        self.save_json(file, content)
+        return content
+
+    @staticmethod
+    def is_data_content(content, not_empty=False) -> bool:
+        """Ответ с данными в обычном виде: блоки с колонками и строками данных
+
+        :param dict content: Ответ
+        :param bool not_empty: Хотя бы в одном блоке должны быть строки данных
+        """
+        if not isinstance(content, dict):  # Если ответ не пришел или пришел не справочник
+            return False
+        blocks = [block_data for block, block_data in content.items() if not block.endswith('.cursor')]  # Блоки данных без курсора пагинации
+        if not blocks or not all(isinstance(block_data, dict) and isinstance(block_data.get('columns'), list) and isinstance(block_data.get('data'), list) for block_data in blocks):  # Если это не блоки данных. Например, ошибка в виде JSON
+            return False
+        return not not_empty or any(block_data['data'] for block_data in blocks)
+
+    @staticmethod
+    def save_json(file, content) -> None:
+        """Сохранение в локальное хранилище. Другие потоки и процессы не увидят частично записанный файл
+
+        :param Path file: Файл
+        :param content: Данные
+        """
+        file.parent.mkdir(parents=True, exist_ok=True)  # Создаем папки хранилища, если их нет
+        fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=file.parent)  # Сначала пишем в уникальный временный файл рядом с файлом
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(content, f, ensure_ascii=False)
+            os.replace(tmp_name, file)  # Атомарно переименовываем
+        except BaseException:  # Если записать не удалось
+            if os.path.exists(tmp_name):  # то удаляем временный файл
+                os.remove(tmp_name)
+            raise
+
     # Запросы REST
 
     def check_result(self, response):
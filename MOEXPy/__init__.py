@@ -1 +1,3 @@
 from .MOEXPy import MOEXPy
+from .Indicators import Indicators, Bar, SMA, EMA, VWAP, ATR, ZScore
+from .Instruments import Instruments